@@ -1,65 +1,313 @@
 import ast
+import hashlib
+import inspect
+import os
+import re
+import sys
+from sys import intern
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from dataclasses import dataclass, field
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from typing import List, Dict, Any, Iterator, Optional, overload
 
-class Symbol(BaseModel):
+import orjson
+
+from .scanner import UNREADABLE_HASH, available_cpus
+
+# Plain slotted dataclasses rather than pydantic models: the analyzer creates
+# one Symbol per def/class across the whole repo and needs no validation.
+@dataclass(slots=True)
+class Symbol:
     name: str
     type: str  # class, function, method
     line_number: int
     docstring: Optional[str] = None
-    params: List[str] = []
+    params: List[str] = field(default_factory=list)
+
+@dataclass(slots=True)
+class SymbolTable:
+    # Symbols stored column-wise (one list per field) instead of one object each.
+    # Iterating or indexing yields Symbol views built on demand.
+    names: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    line_numbers: array = field(default_factory=lambda: array("i"))
+    docstrings: List[Optional[str]] = field(default_factory=list)
+    params: List[List[str]] = field(default_factory=list)
+
+    def append(self, name: str, kind: str, line_number: int,
+               docstring: Optional[str] = None, params: Optional[List[str]] = None) -> None:
+        self.names.append(name)
+        self.types.append(kind)
+        self.line_numbers.append(line_number)
+        self.docstrings.append(docstring)
+        self.params.append(params if params is not None else [])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @overload
+    def __getitem__(self, i: int) -> Symbol: ...
+    @overload
+    def __getitem__(self, i: slice) -> List[Symbol]: ...
+
+    def __getitem__(self, i):
+        # Slices give a list of Symbols, like the List[Symbol] this table replaced
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Symbol(self.names[i], self.types[i], self.line_numbers[i], self.docstrings[i], self.params[i])
+
+    def __iter__(self) -> Iterator[Symbol]:
+        for row in zip(self.names, self.types, self.line_numbers, self.docstrings, self.params):
+            yield Symbol(*row)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": n, "type": t, "line_number": l, "docstring": d, "params": p}
+            for n, t, l, d, p in zip(self.names, self.types, self.line_numbers, self.docstrings, self.params)
+        ]
+
+    @classmethod
+    def from_list(cls, rows: List[Dict[str, Any]]) -> "SymbolTable":
+        table = cls()
+        for row in rows:
+            table.append(row["name"], row["type"], row["line_number"], row.get("docstring"), row.get("params"))
+        return table
 
-class FileAnalysis(BaseModel):
+@dataclass(slots=True)
+class FileAnalysis:
     path: str
-    classes: List[Symbol] = []
-    functions: List[Symbol] = []
-    imports: List[str] = []
+    classes: SymbolTable = field(default_factory=SymbolTable)
+    functions: SymbolTable = field(default_factory=SymbolTable)
+    imports: List[str] = field(default_factory=list)
     loc: int = 0
 
+    def symbols(self) -> Iterator[Symbol]:
+        yield from self.classes
+        yield from self.functions
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Row-per-symbol form, as used for prompts and the analysis cache
+        return {
+            "path": self.path,
+            "classes": self.classes.to_list(),
+            "functions": self.functions.to_list(),
+            "imports": list(self.imports),
+            "loc": self.loc
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FileAnalysis":
+        # Cache entries live inside the analyzed repo, so don't trust their shape
+        if not (isinstance(data, dict) and isinstance(data.get("path"), str)
+                and _is_int(data.get("loc")) and _is_str_list(data.get("imports"))
+                and _is_symbol_rows(data.get("classes")) and _is_symbol_rows(data.get("functions"))):
+            raise ValueError("malformed FileAnalysis data")
+        return cls(
+            path=data["path"],
+            classes=SymbolTable.from_list(data["classes"]),
+            functions=SymbolTable.from_list(data["functions"]),
+            imports=[intern(name) for name in data["imports"]],
+            loc=data["loc"]
+        )
+
+def _is_int(value: Any) -> bool:
+    return type(value) is int
+
+def _is_str_list(value: Any) -> bool:
+    return type(value) is list and all(type(v) is str for v in value)
+
+def _is_symbol_rows(rows: Any) -> bool:
+    return type(rows) is list and all(
+        type(row) is dict
+        and type(row.get("name")) is str
+        and type(row.get("type")) is str
+        and _is_int(row.get("line_number"))
+        and (row.get("docstring") is None or type(row["docstring"]) is str)
+        and _is_str_list(row.get("params", []))
+        for row in rows
+    )
+
+def _fast_docstring(node: ast.AST) -> Optional[str]:
+    # ast.get_docstring without the call overhead on the common no-docstring path
+    body = node.body
+    if not body:
+        return None
+    stmt = body[0]
+    if type(stmt) is not ast.Expr:
+        return None
+    value = stmt.value
+    if type(value) is not ast.Constant or type(value.value) is not str:
+        return None
+    return inspect.cleandoc(value.value)
+
+def _h_class(analysis: FileAnalysis, node: ast.ClassDef) -> None:
+    analysis.classes.append(node.name, "class", node.lineno, _fast_docstring(node))
+
+def _h_func(analysis: FileAnalysis, node: ast.FunctionDef) -> None:
+    # Check if it's a method (inside a class)
+    # For simplicity, we'll just check all functions
+    analysis.functions.append(
+        node.name,
+        "function" if type(node) is ast.FunctionDef else "async_function",
+        node.lineno,
+        _fast_docstring(node),
+        [arg.arg for arg in node.args.args]
+    )
+
+def _h_import(analysis: FileAnalysis, node: ast.Import) -> None:
+    # Interned: the same few module names repeat across every file of a repo
+    for alias in node.names:
+        analysis.imports.append(intern(alias.name))
+
+def _h_importfrom(analysis: FileAnalysis, node: ast.ImportFrom) -> None:
+    if node.module:
+        analysis.imports.append(intern(node.module))
+
+# Dispatch on exact node type instead of an isinstance chain
+_HANDLERS = {
+    ast.ClassDef: _h_class,
+    ast.FunctionDef: _h_func,
+    ast.AsyncFunctionDef: _h_func,
+    ast.Import: _h_import,
+    ast.ImportFrom: _h_importfrom,
+}
+
+# Classes, functions and imports are statements, so they can only live in the
+# statement lists of these containers. Everything else (leaf statements and all
+# expression subtrees) is pruned without being visited.
+_TRY_FIELDS = ("body", "handlers", "orelse", "finalbody")
+_STMT_CONTAINERS = {
+    ast.Module: ("body",),
+    ast.ClassDef: ("body",),
+    ast.FunctionDef: ("body",),
+    ast.AsyncFunctionDef: ("body",),
+    ast.If: ("body", "orelse"),
+    ast.For: ("body", "orelse"),
+    ast.AsyncFor: ("body", "orelse"),
+    ast.While: ("body", "orelse"),
+    ast.With: ("body",),
+    ast.AsyncWith: ("body",),
+    ast.Try: _TRY_FIELDS,
+    ast.TryStar: _TRY_FIELDS,
+    ast.ExceptHandler: ("body",),
+    ast.Match: ("cases",),
+    ast.match_case: ("body",),
+}
+
+# Cheap byte-level check for anything the walk could pick up. Indented (including
+# form feeds, which Python accepts there) and `if x: import y` style statements
+# count, false positives just cost a parse.
+_INTERESTING = re.compile(rb"(?:^|[;:])[ \t\f]*(?:class|def|async|import|from)\b", re.MULTILINE)
+
+# Mixed into the cache key; bump the version when FileAnalysis changes shape
+_CACHE_TAG = f"py{sys.version_info[0]}.{sys.version_info[1]}-v3:".encode()
+
+def _cache_path(cache_dir: Path, raw: bytes) -> Path:
+    h = hashlib.sha256(_CACHE_TAG + raw).hexdigest()
+    return cache_dir / h[:2] / f"{h}.json"
+
+def _load_cached(cache_path: Path, rel_path: str) -> Optional[FileAnalysis]:
+    try:
+        # Plain JSON, never pickle: anyone who controls the repo controls these files
+        with open(cache_path, "rb") as f:
+            data = orjson.loads(f.read())
+        # Identical sources at different paths share an entry
+        data["path"] = rel_path
+        return FileAnalysis.from_dict(data)
+    except Exception:
+        # Missing or unreadable entry, treat as a miss
+        return None
+
+def _store_cached(cache_path: Path, analysis: FileAnalysis) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(analysis.to_dict()))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Caching is best effort
+
+# Below this many files a process pool costs more than it saves
+_MIN_PARALLEL_FILES = 64
+
+def _count_lines(raw: bytes) -> int:
+    # Same as len(raw.splitlines()) for \n / \r\n files, without building the list
+    return raw.count(b"\n") + (1 if raw and not raw.endswith(b"\n") else 0)
+
+def _analyze_source(code: str, rel_path: str, loc: int) -> FileAnalysis:
+    try:
+        tree = ast.parse(code, filename=rel_path, type_comments=False)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        # Invalid code, null bytes, or too deeply nested / huge to parse: keep the line count only
+        return FileAnalysis(path=rel_path, loc=loc)
+
+    analysis = FileAnalysis(path=rel_path, loc=loc)
+    
+    # Breadth-first like ast.walk, so symbols keep the same order
+    queue = deque([tree])
+    while queue:
+        node = queue.popleft()
+        handler = _HANDLERS.get(type(node))
+        if handler is not None:
+            handler(analysis, node)
+        fields = _STMT_CONTAINERS.get(type(node))
+        if fields is not None:
+            for name in fields:
+                queue.extend(getattr(node, name))
+
+    return analysis
+
+def _analyze_one(file_path: Path, rel_path: str, cache_dir: Optional[Path] = None) -> FileAnalysis:
+    # Module-level so it can be shipped to worker processes
+    try:
+        raw = file_path.read_bytes()
+    except OSError:
+        # Unreadable since the scan; one bad file mustn't abort the whole repo
+        return FileAnalysis(path=rel_path, loc=0)
+    loc = _count_lines(raw)
+    if not _INTERESTING.search(raw):
+        return FileAnalysis(path=rel_path, loc=loc)
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = _cache_path(cache_dir, raw)
+        cached = _load_cached(cache_path, rel_path)
+        if cached is not None:
+            return cached
+
+    analysis = _analyze_source(raw.decode("utf-8", errors="ignore"), rel_path, loc)
+    if cache_path is not None:
+        _store_cached(cache_path, analysis)
+    return analysis
+
 class RepoAnalyzer:
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
     def analyze_python_file(self, file_path: Path, rel_path: str) -> FileAnalysis:
-        with open(file_path, "r", errors="ignore") as f:
-            code = f.read()
-        
-        try:
-            tree = ast.parse(code)
-        except SyntaxError:
-            return FileAnalysis(path=rel_path, loc=len(code.splitlines()))
-
-        analysis = FileAnalysis(path=rel_path, loc=len(code.splitlines()))
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                analysis.classes.append(Symbol(
-                    name=node.name,
-                    type="class",
-                    line_number=node.lineno,
-                    docstring=ast.get_docstring(node)
-                ))
-            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                # Check if it's a method (inside a class)
-                # For simplicity, we'll just check all functions
-                analysis.functions.append(Symbol(
-                    name=node.name,
-                    type="function" if isinstance(node, ast.FunctionDef) else "async_function",
-                    line_number=node.lineno,
-                    docstring=ast.get_docstring(node),
-                    params=[arg.arg for arg in node.args.args]
-                ))
-            elif isinstance(node, ast.Import):
-                for alias in node.names:
-                    analysis.imports.append(alias.name)
-            elif isinstance(node, ast.ImportFrom):
-                if node.module:
-                    analysis.imports.append(node.module)
-
-        return analysis
+        return _analyze_one(file_path, rel_path, self.cache_dir)
 
     def analyze_repo(self, repo_path: Path, manifest: Any) -> Dict[str, FileAnalysis]:
+        # The scanner couldn't read these either, so there's nothing to parse
+        rel_paths = [rel_path for rel_path, entry in manifest.python_files
+                     if not entry.hash.startswith(UNREADABLE_HASH)]
+        abs_paths = [repo_path / rel_path for rel_path in rel_paths]
+
+        workers = available_cpus()
+        if workers == 1 or len(rel_paths) < _MIN_PARALLEL_FILES:
+            return {rel: self.analyze_python_file(p, rel) for p, rel in zip(abs_paths, rel_paths)}
+
+        # Parsing is pure CPU, so fan out across processes; batch files to amortize IPC
+        chunksize = max(1, min(16, len(rel_paths) // (workers * 4)))
         results = {}
-        for rel_path, entry in manifest.files.items():
-            if entry.language == "python":
-                abs_path = repo_path / rel_path
-                results[rel_path] = self.analyze_python_file(abs_path, rel_path)
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            analyses = ex.map(_analyze_one, abs_paths, rel_paths, repeat(self.cache_dir), chunksize=chunksize)
+            for rel_path, analysis in zip(rel_paths, analyses):
+                # Unpickled worker results are not interned in this process
+                analysis.imports = [intern(name) for name in analysis.imports]
+                results[rel_path] = analysis
         return results
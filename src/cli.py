@@ -1,5 +1,5 @@
 import typer
-import json
+import orjson
 from pathlib import Path
 from datetime import datetime
 from llama_index.core import Settings
@@ -27,6 +27,12 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_API_KEY = PROJECT_ROOT / "api_key" / "openai.txt"
 DEFAULT_RUNS_DIR = PROJECT_ROOT / "runs"
 DEFAULT_INDICES_DIR = PROJECT_ROOT / "data" / "indices"
+EMBED_BATCH_SIZE = 256  # Texts per embeddings request (llama-index defaults to 10)
+
+def write_json(path: Path, data) -> None:
+    # orjson writes bytes straight from the dict; much faster than json.dump for big reports
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 def setup_mocks():
     # Placeholder for real configuration
@@ -37,13 +43,17 @@ def setup_openai(api_key: str, model: str = "gpt-4o"):
     import httpx
     os.environ["OPENAI_API_KEY"] = api_key
     
-    # Create a custom httpx client with a 10-minute timeout
-    # This is the most reliable way to override the 60s default
-    timeout = httpx.Timeout(600.0, connect=60.0)
-    client = httpx.Client(timeout=timeout)
+    # 10-minute timeouts. The SDK applies its own per-request timeout (60s by
+    # default) on top of any client's, so it is set on the models themselves
+    client = httpx.Client(timeout=httpx.Timeout(600.0, connect=60.0))
     
-    Settings.llm = OpenAI(model=model, http_client=client, max_retries=3)
-    Settings.embed_model = OpenAIEmbedding(model="text-embedding-3-small", http_client=client)
+    # No cached clients for the LLM: evaluation makes its async calls under a fresh
+    # asyncio.run loop per pass, and a cached async client stays bound to the first
+    # loop. The SDK closes injected clients along with itself, so none are passed.
+    Settings.llm = OpenAI(model=model, timeout=600.0, reuse_client=False, max_retries=3)
+    Settings.embed_model = OpenAIEmbedding(
+        model="text-embedding-3-small", embed_batch_size=EMBED_BATCH_SIZE, timeout=600.0, http_client=client
+    )
 
 @app.command()
 def generate(
@@ -103,7 +113,7 @@ def generate(
         indexer.update_index(manifest, repo_path_obj)
         # Estimate embedding cost: manifest files content
         total_chars = sum(f.size for f in manifest.files.values() if f.language)
-        cost_tracker.estimate_and_add(" " * total_chars, "", model="gpt-4-turbo")
+        cost_tracker.estimate_from_length(total_chars, 0, model="gpt-4-turbo")
     
     # 2.1. Think (Synthesize Knowledge)
     knowledge_path = agent_dir / "knowledge.md"
@@ -125,7 +135,7 @@ def generate(
 
     if not knowledge:
         typer.echo("Analyzing repository architecture and building knowledge base...")
-        analyzer = RepoAnalyzer()
+        analyzer = RepoAnalyzer(cache_dir=agent_dir / "ast-cache")
         thinker = RepoThinker(indexer, analyzer)
         knowledge = thinker.synthesize_knowledge(manifest, repo_path_obj)
         
@@ -133,8 +143,7 @@ def generate(
         with open(knowledge_path, "w") as f:
             f.write(RepoThinker.to_markdown(knowledge))
         
-        with open(knowledge_json_p, "w") as f:
-            f.write(knowledge.model_dump_json(indent=2))
+        write_json(knowledge_json_p, knowledge.model_dump(mode="json"))
     
     # 3. Generate
     typer.echo("Generating comprehensive ideas...")
@@ -146,11 +155,13 @@ def generate(
         
     researcher = WebResearcher(provider)
     generator = IdeaGenerator(indexer, researcher)
-    report = generator.generate_ideas(manifest, knowledge, num_ideas=num_ideas)
+    repo_context = generator.get_context_from_knowledge(knowledge)
+    report = generator.generate_ideas(manifest, knowledge, num_ideas=num_ideas, repo_context=repo_context)
     # Estimate generation cost: context + report
-    context_size = len(generator.get_context_from_knowledge(knowledge))
-    report_size = len(report.model_dump_json())
-    cost_tracker.estimate_and_add(" " * context_size, " " * report_size, model="gpt-4-turbo")
+    context_size = len(repo_context)
+    report_data = report.model_dump(mode="json")
+    report_size = len(orjson.dumps(report_data))
+    cost_tracker.estimate_from_length(context_size, report_size, model="gpt-4-turbo")
     
     # 4. Evaluate
     typer.echo("Evaluating and verifying ideas with targeted research...")
@@ -160,70 +171,70 @@ def generate(
     
     # 5. Save Report
     report_json = run_dir / "report.json"
-    with open(report_json, "w") as f:
-        f.write(report.model_dump_json(indent=2))
+    write_json(report_json, report_data)
         
     eval_json = run_dir / "evaluation.json"
-    with open(eval_json, "w") as f:
-        json.dump([r.model_dump(mode='json') for r in eval_results], f, indent=2)
+    write_json(eval_json, [r.model_dump(mode='json') for r in eval_results])
         
     # Save Metrics & Cost
     summary = cost_tracker.get_summary()
-    with open(run_dir / "metrics.json", "w") as f:
-        json.dump(summary, f, indent=2)
+    write_json(run_dir / "metrics.json", summary)
         
     # Generate Markdown summary
     summary_path = run_dir / "report.md"
     nl = chr(10)
+    parts = []
+    parts.append(f"# Idea Generation Report{nl}")
+    parts.append(f"Repo: {repo_path_obj.name}{nl}")
+    parts.append(f"Date: {timestamp}{nl}{nl}")
+    parts.append(f"## Cost Summary{nl}")
+    parts.append(f"- Total Cost: ${summary['total_cost_usd']:.4f}{nl}")
+    parts.append(f"- Tokens: {summary['token_usage']['input']} in / {summary['token_usage']['output']} out{nl}{nl}")
+    
+    parts.append(f"## Research Base & Analyzed Papers{nl}")
+    if report.research_findings:
+        for finding in report.research_findings:
+            parts.append(f"### Paper: {finding.paper_title}{nl}")
+            parts.append(f"- **URL**: {finding.url}{nl}")
+            parts.append(f"- **Key Idea**: {finding.key_idea}{nl}")
+            parts.append(f"- **Relevance**: {finding.relevance_to_repo}{nl}{nl}")
+    else:
+        parts.append(f"No specific research findings extracted.{nl}{nl}")
+        
+    parts.append(f"---{nl}{nl}")
+    parts.append(f"## Proposed Ideas{nl}{nl}")
+    for i, (idea, eval_res) in enumerate(zip(report.ideas, eval_results)):
+        parts.append(f"## PROPOSAL {i+1}: {idea.title}{nl}")
+        parts.append(f"**Overall Quality Score: {eval_res.score.overall:.2f}/5.00**{nl}{nl}")
+        
+        parts.append(f"### 1. RATIONALE{nl}{idea.rationale}{nl}{nl}")
+        
+        parts.append(f"### 2. DETAILED DESCRIPTION{nl}{idea.detailed_description}{nl}{nl}")
+        
+        parts.append(f"### 3. RESEARCH BACKING & CITATIONS{nl}")
+        for c in idea.research_backing:
+            parts.append(f"- **{c.title}** ({c.source}): {c.url}{nl}")
+        parts.append(f"{nl}")
+        
+        parts.append(f"### 4. TECHNICAL IMPLEMENTATION PLAN{nl}{idea.implementation_plan}{nl}{nl}")
+        
+        parts.append(f"### 5. FEASIBILITY ANALYSIS{nl}{idea.feasibility}{nl}{nl}")
+        
+        parts.append(f"### 6. RISKS AND MITIGATIONS{nl}{idea.risks_and_mitigations}{nl}{nl}")
+        
+        parts.append(f"### 7. EXPECTED IMPACT{nl}{idea.impact}{nl}{nl}")
+        
+        parts.append(f"### 8. SUCCESS METRICS{nl}{idea.success_metrics}{nl}{nl}")
+        
+        parts.append(f"### 9. REPOSITORY GROUNDING{nl}")
+        for ref in idea.grounding_references:
+            parts.append(f"- `{ref}`{nl}")
+        parts.append(f"{nl}")
+        
+        parts.append(f"---{nl}{nl}")
+
     with open(summary_path, "w") as f:
-        f.write(f"# Idea Generation Report{nl}")
-        f.write(f"Repo: {repo_path_obj.name}{nl}")
-        f.write(f"Date: {timestamp}{nl}{nl}")
-        f.write(f"## Cost Summary{nl}")
-        f.write(f"- Total Cost: ${summary['total_cost_usd']:.4f}{nl}")
-        f.write(f"- Tokens: {summary['token_usage']['input']} in / {summary['token_usage']['output']} out{nl}{nl}")
-        
-        f.write(f"## Research Base & Analyzed Papers{nl}")
-        if report.research_findings:
-            for finding in report.research_findings:
-                f.write(f"### Paper: {finding.paper_title}{nl}")
-                f.write(f"- **URL**: {finding.url}{nl}")
-                f.write(f"- **Key Idea**: {finding.key_idea}{nl}")
-                f.write(f"- **Relevance**: {finding.relevance_to_repo}{nl}{nl}")
-        else:
-            f.write(f"No specific research findings extracted.{nl}{nl}")
-            
-        f.write(f"---{nl}{nl}")
-        f.write(f"## Proposed Ideas{nl}{nl}")
-        for i, (idea, eval_res) in enumerate(zip(report.ideas, eval_results)):
-            f.write(f"## PROPOSAL {i+1}: {idea.title}{nl}")
-            f.write(f"**Overall Quality Score: {eval_res.score.overall:.2f}/5.00**{nl}{nl}")
-            
-            f.write(f"### 1. RATIONALE{nl}{idea.rationale}{nl}{nl}")
-            
-            f.write(f"### 2. DETAILED DESCRIPTION{nl}{idea.detailed_description}{nl}{nl}")
-            
-            f.write(f"### 3. RESEARCH BACKING & CITATIONS{nl}")
-            for c in idea.research_backing:
-                f.write(f"- **{c.title}** ({c.source}): {c.url}{nl}")
-            f.write(f"{nl}")
-            
-            f.write(f"### 4. TECHNICAL IMPLEMENTATION PLAN{nl}{idea.implementation_plan}{nl}{nl}")
-            
-            f.write(f"### 5. FEASIBILITY ANALYSIS{nl}{idea.feasibility}{nl}{nl}")
-            
-            f.write(f"### 6. RISKS AND MITIGATIONS{nl}{idea.risks_and_mitigations}{nl}{nl}")
-            
-            f.write(f"### 7. EXPECTED IMPACT{nl}{idea.impact}{nl}{nl}")
-            
-            f.write(f"### 8. SUCCESS METRICS{nl}{idea.success_metrics}{nl}{nl}")
-            
-            f.write(f"### 9. REPOSITORY GROUNDING{nl}")
-            for ref in idea.grounding_references:
-                f.write(f"- `{ref}`{nl}")
-            f.write(f"{nl}")
-            
-            f.write(f"---{nl}{nl}")
+        f.write("".join(parts))
 
     typer.echo(f"Run completed successfully! Results in {run_dir}")
     typer.echo(f"Estimated Cost: ${summary['total_cost_usd']:.4f}")
@@ -1,10 +1,25 @@
+import asyncio
 from typing import List, Dict, Any, Optional
 from .models import Idea, IdeaScore, EvaluationResult
 from .researcher import WebResearcher
 
+# Simulated rubric scores used in mock mode
+_MOCK_SCORES = {
+    "novelty": 4.0,
+    "feasibility": 3.5,
+    "impact": 4.5,
+    "alignment": 5.0,
+    "evidence_quality": 4.0,
+    "repo_grounding": 4.5
+}
+
 class IdeaEvaluator:
-    def __init__(self, researcher: Optional[WebResearcher] = None, weights: Optional[Dict[str, float]] = None):
+    def __init__(self, researcher: Optional[WebResearcher] = None, weights: Optional[Dict[str, float]] = None,
+                 max_concurrency: int = 8):
         self.researcher = researcher
+        # Upper bound on ideas evaluated at once, to stay within provider rate limits
+        self.max_concurrency = max_concurrency
+        self._score_program = None
         self.weights = weights or {
             "novelty": 1.0,
             "feasibility": 1.0,
@@ -13,97 +28,120 @@ class IdeaEvaluator:
             "evidence_quality": 0.5,
             "repo_grounding": 1.0
         }
+        # Fixed for the evaluator's lifetime, so not recomputed per idea
+        self._weight_items = tuple(self.weights.items())
+        self._weight_sum = sum(self.weights.values())
 
     def evaluate_idea(self, idea: Idea) -> EvaluationResult:
+        return asyncio.run(self.aevaluate_idea(idea))
+
+    def _should_verify(self) -> bool:
+        from llama_index.core.llms.mock import MockLLM
+        from llama_index.core import Settings
+
+        return self.researcher is not None and not isinstance(Settings.llm, MockLLM)
+
+    @staticmethod
+    def _verification_query(idea: Idea) -> str:
+        # Generate a specific verification query
+        return f"state of the art and competitors for: {idea.title}"
+
+    async def aevaluate_idea(self, idea: Idea, verification_research: Optional[List[Any]] = None) -> EvaluationResult:
         from llama_index.core.llms.mock import MockLLM
         from llama_index.core import Settings
         
-        verification_research = []
-        if self.researcher and not isinstance(Settings.llm, MockLLM):
-            print(f"Verifying idea '{idea.title}' with targeted online research...")
-            # Generate a specific verification query
-            query = f"state of the art and competitors for: {idea.title}"
-            verification_research = self.researcher.perform_research(query, depth=1)
+        if verification_research is None:
+            verification_research = []
+            if self._should_verify():
+                print(f"Verifying idea '{idea.title}' with targeted online research...")
+                query = self._verification_query(idea)
+                verification_research = await self.researcher.aperform_research(query, depth=1)
         
         if isinstance(Settings.llm, MockLLM):
             score = self._mock_score_idea(idea)
         else:
-            score = self._real_score_idea(idea, verification_research)
+            score = await self._real_score_idea(idea, verification_research)
             
         return EvaluationResult(
             idea_title=idea.title,
             score=score
         )
 
-    def _real_score_idea(self, idea: Idea, verification_research: List[Any] = []) -> IdeaScore:
-        from llama_index.core.program import LLMTextCompletionProgram
-        
+    def _get_score_program(self):
+        # Built once and shared by every idea (and every concurrent evaluation)
+        if self._score_program is None:
+            from llama_index.core.program import LLMTextCompletionProgram
+
+            prompt_template_str = (
+                "You are a Senior Technical Reviewer. Evaluate the following product/engineering idea.\n\n"
+                "IDEA:\n{idea_json}{research_context}\n\n"
+                "RUBRIC (Score each 0-5):\n"
+                "- Novelty: Is this truly unique? Check against the verification research.\n"
+                "- Feasibility: Time-to-implement and technical risk.\n"
+                "- Impact: Expected measurable gains.\n"
+                "- Alignment: Fit with repo purpose.\n"
+                "- Evidence Quality: Authority and recency of research.\n"
+                "- Repo Grounding: Quality of concrete code references.\n\n"
+                "Provide scores and a formal, critical rationale. Output as JSON matching IdeaScore schema."
+            )
+
+            self._score_program = LLMTextCompletionProgram.from_defaults(
+                output_cls=IdeaScore,
+                prompt_template_str=prompt_template_str,
+                verbose=True
+            )
+        return self._score_program
+
+    async def _real_score_idea(self, idea: Idea, verification_research: List[Any] = []) -> IdeaScore:
         research_context = ""
         if verification_research:
             research_context = "\n\nVERIFICATION RESEARCH:\n" + "\n".join(
                 [f"- {r.title}: {r.snippet}" for r in verification_research]
             )
 
-        prompt_template_str = (
-            "You are a Senior Technical Reviewer. Evaluate the following product/engineering idea.\n\n"
-            "IDEA:\n{idea_json}{research_context}\n\n"
-            "RUBRIC (Score each 0-5):\n"
-            "- Novelty: Is this truly unique? Check against the verification research.\n"
-            "- Feasibility: Time-to-implement and technical risk.\n"
-            "- Impact: Expected measurable gains.\n"
-            "- Alignment: Fit with repo purpose.\n"
-            "- Evidence Quality: Authority and recency of research.\n"
-            "- Repo Grounding: Quality of concrete code references.\n\n"
-            "Provide scores and a formal, critical rationale. Output as JSON matching IdeaScore schema."
-        )
-
-        program = LLMTextCompletionProgram.from_defaults(
-            output_cls=IdeaScore,
-            prompt_template_str=prompt_template_str,
-            verbose=True
-        )
+        program = self._get_score_program()
         
         print(f"Evaluating idea: {idea.title}...")
-        score = program(
+        score = await program.acall(
             idea_json=idea.model_dump_json(),
             research_context=research_context
         )
         
         # Recalculate overall based on weights if the LLM didn't (or to ensure consistency)
-        total_weight = sum(self.weights.values())
-        scores = {
-            "novelty": score.novelty,
-            "feasibility": score.feasibility,
-            "impact": score.impact,
-            "alignment": score.alignment,
-            "evidence_quality": score.evidence_quality,
-            "repo_grounding": score.repo_grounding
-        }
-        score.overall = sum(scores[k] * self.weights[k] for k in scores) / total_weight
+        score.overall = sum(getattr(score, k) * w for k, w in self._weight_items) / self._weight_sum
         
         return score
 
     def _mock_score_idea(self, idea: Idea) -> IdeaScore:
-        # Simulate scoring
-        scores = {
-            "novelty": 4.0,
-            "feasibility": 3.5,
-            "impact": 4.5,
-            "alignment": 5.0,
-            "evidence_quality": 4.0,
-            "repo_grounding": 4.5
-        }
-        
         # Calculate weighted overall
-        total_weight = sum(self.weights.values())
-        weighted_sum = sum(scores[k] * self.weights[k] for k in scores)
-        overall = weighted_sum / total_weight
+        overall = sum(_MOCK_SCORES[k] * w for k, w in self._weight_items) / self._weight_sum
         
         return IdeaScore(
-            **scores,
+            **_MOCK_SCORES,
             overall=overall,
             rationale="Idea is strongly aligned with repo architecture and grounded in recent research."
         )
 
     def evaluate_report(self, report: Any) -> List[EvaluationResult]:
-        return [self.evaluate_idea(idea) for idea in report.ideas]
+        return asyncio.run(self.aevaluate_report(report))
+
+    async def aevaluate_report(self, report: Any) -> List[EvaluationResult]:
+        ideas = list(report.ideas)
+
+        # Fetch verification research for all ideas in one batch up front
+        research: List[List[Any]] = [[] for _ in ideas]
+        if ideas and self._should_verify():
+            print(f"Verifying {len(ideas)} ideas with targeted online research...")
+            queries = [self._verification_query(idea) for idea in ideas]
+            research = await self.researcher.aperform_research_batch(
+                queries, depth=1, max_concurrency=self.max_concurrency
+            )
+
+        # Each idea is then an independent LLM round-trip, so score them concurrently
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(idea: Idea, verification_research: List[Any]) -> EvaluationResult:
+            async with semaphore:
+                return await self.aevaluate_idea(idea, verification_research)
+
+        return list(await asyncio.gather(*(bounded(i, r) for i, r in zip(ideas, research))))
@@ -1,25 +1,50 @@
-from typing import List, Dict, Any
+import hashlib
+import json
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from llama_index.core import Settings
 from llama_index.core.llms.mock import MockLLM
-from .models import Idea, IdeaReport, Citation, Manifest, ProjectKnowledge
+from pydantic import BaseModel
+from .models import Idea, IdeaReport, Citation, Manifest, ProjectKnowledge, ResearchFinding
 from .indexer import RepoIndexer
 from .researcher import WebResearcher, ResearchResult
 
+class ResearchAnalysis(BaseModel):
+    research_findings: List[ResearchFinding]
+
+class SingleIdea(BaseModel):
+    idea: Idea
+
 class IdeaGenerator:
     def __init__(self, indexer: RepoIndexer, researcher: WebResearcher):
         self.indexer = indexer
         self.researcher = researcher
+        # Prompt templates and structured-output programs are built on first use
+        # and reused, rather than recompiled for every call
+        self._topic_prompt = None
+        self._analysis_program = None
+        self._idea_program = None
 
-    def generate_ideas(self, manifest: Manifest, knowledge: ProjectKnowledge, num_ideas: int = 5) -> IdeaReport:
+    def generate_ideas(self, manifest: Manifest, knowledge: ProjectKnowledge, num_ideas: int = 5,
+                       repo_context: Optional[str] = None) -> IdeaReport:
         # 1. Use synthesized knowledge as the primary core context
-        repo_context = self.get_context_from_knowledge(knowledge)
+        if repo_context is None:
+            repo_context = self.get_context_from_knowledge(knowledge)
         
         # 2. Dynamically determine research topic based on deep knowledge
-        research_topic = self._generate_research_topic(repo_context)
-        print(f"Researching: {research_topic}...")
-        
-        research_results = self.researcher.perform_research(research_topic)
+        cache_key = self._research_cache_key(repo_context)
+        cached = self._load_research_cache(cache_key)
+        if cached:
+            research_topic, research_results = cached
+            print(f"Reusing cached research for: {research_topic}")
+        else:
+            research_topic = self._generate_research_topic(repo_context)
+            print(f"Researching: {research_topic}...")
+            
+            research_results, used_fallback = self.researcher.perform_research_checked(research_topic)
+            # Stand-in papers from a failed search would otherwise be reused as research forever
+            if research_results and not used_fallback:
+                self._store_research_cache(cache_key, research_topic, research_results)
         
         # 3. Use LLM to generate ideas and research findings
         if isinstance(Settings.llm, MockLLM):
@@ -45,91 +70,130 @@ class IdeaGenerator:
             context += f"- [{f.category}] {f.summary}: {f.detailed_insight}{nl}"
         return context
 
+    def _research_cache_key(self, repo_context: str) -> Optional[str]:
+        # Topic and research depend only on the context (plus model/provider),
+        # so an unchanged knowledge base skips both round-trips. Mock runs are not cached.
+        if isinstance(Settings.llm, MockLLM):
+            return None
+        provider = type(self.researcher.provider).__name__
+        model = getattr(Settings.llm, "model", "")
+        return hashlib.sha256(f"{provider}:{model}\n{repo_context}".encode()).hexdigest()
+
+    def _load_research_cache(self, key: Optional[str]) -> Optional[Tuple[str, List[ResearchResult]]]:
+        if key is None:
+            return None
+        cache_dir = Path(self.indexer.storage_dir) / "topic-cache"
+        try:
+            topic = (cache_dir / f"{key}.txt").read_text()
+            with open(cache_dir / f"{key}.json", "r") as f:
+                results = [ResearchResult.model_validate(r) for r in json.load(f)]
+        except Exception:
+            return None
+        return topic, results
+
+    def _store_research_cache(self, key: Optional[str], topic: str, results: List[ResearchResult]):
+        if key is None:
+            return
+        cache_dir = Path(self.indexer.storage_dir) / "topic-cache"
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(cache_dir / f"{key}.json", "w") as f:
+                json.dump([r.model_dump(mode="json") for r in results], f)
+            # Written last: a topic file marks a complete entry
+            (cache_dir / f"{key}.txt").write_text(topic)
+        except OSError as e:
+            print(f"Warning: Could not cache research results: {e}")
+
     def _generate_research_topic(self, repo_context: str) -> str:
         if isinstance(Settings.llm, MockLLM):
             return "agentic software research tools 2026"
             
-        from llama_index.core.prompts import PromptTemplate
-        
-        prompt = PromptTemplate(
-            "Analyze the following repository context and provide a single, high-leverage "
-            "web research query (e.g. 'state of the art in X 2025') that would help "
-            "generate innovative product ideas for this project.\n\n"
-            "CONTEXT:\n{repo_context}\n\n"
-            "QUERY:"
-        )
+        if self._topic_prompt is None:
+            from llama_index.core.prompts import PromptTemplate
+
+            self._topic_prompt = PromptTemplate(
+                "Analyze the following repository context and provide a single, high-leverage "
+                "web research query (e.g. 'state of the art in X 2025') that would help "
+                "generate innovative product ideas for this project.\n\n"
+                "CONTEXT:\n{repo_context}\n\n"
+                "QUERY:"
+            )
         
-        response = Settings.llm.complete(prompt.format(repo_context=repo_context[:4000]))
+        response = Settings.llm.complete(self._topic_prompt.format(repo_context=repo_context[:4000]))
         return response.text.strip().strip('"')
 
-    def _real_generate_report(self, repo_context: str, research: List[ResearchResult], num: int) -> Dict[str, Any]:
-        from llama_index.core.program import LLMTextCompletionProgram
-        from pydantic import BaseModel, Field
-        from .models import ResearchFinding, Idea
+    def _get_analysis_program(self):
+        if self._analysis_program is None:
+            from llama_index.core.program import LLMTextCompletionProgram
 
-        class ResearchAnalysis(BaseModel):
-            research_findings: List[ResearchFinding]
+            analysis_prompt = (
+                "You are a Principal Agent Systems Architect. Analyze the provided web research.\n"
+                "Extract the most relevant 'Key Idea' from each source and explain its specific "
+                "'Relevance' to this repository's current architecture and future goals.\n\n"
+                "REPO CONTEXT:\n{repo_context}\n\n"
+                "WEB RESEARCH:\n{research_context}\n\n"
+                "Output as JSON matching ResearchAnalysis schema."
+            )
+            self._analysis_program = LLMTextCompletionProgram.from_defaults(
+                output_cls=ResearchAnalysis,
+                prompt_template_str=analysis_prompt,
+                verbose=True
+            )
+        return self._analysis_program
 
-        class SingleIdea(BaseModel):
-            idea: Idea
+    def _get_idea_program(self):
+        if self._idea_program is None:
+            from llama_index.core.program import LLMTextCompletionProgram
 
+            idea_prompt = (
+                "You are a Lead Scientist. Based on the repo and research, generate a single formal engineering proposal.\n"
+                "This is proposal {index} of {total}.\n\n"
+                "REPO CONTEXT:\n{repo_context}\n\n"
+                "RESEARCH FINDINGS:\n{findings}\n\n"
+                "The proposal must be comprehensive (Rationale, Detailed Description, Implementation Plan, etc.) "
+                "and formal. Avoid repeating previous ideas: {previous_titles}"
+            )
+            self._idea_program = LLMTextCompletionProgram.from_defaults(
+                output_cls=SingleIdea,
+                prompt_template_str=idea_prompt,
+                verbose=True
+            )
+        return self._idea_program
+
+    def _real_generate_report(self, repo_context: str, research: List[ResearchResult], num: int) -> Dict[str, Any]:
         # STEP 1: RESEARCH ANALYSIS
-        analysis_prompt = (
-            "You are a Principal Agent Systems Architect. Analyze the provided web research.\n"
-            "Extract the most relevant 'Key Idea' from each source and explain its specific "
-            "'Relevance' to this repository's current architecture and future goals.\n\n"
-            "REPO CONTEXT:\n{repo_context}\n\n"
-            "WEB RESEARCH:\n{research_context}\n\n"
-            "Output as JSON matching ResearchAnalysis schema."
-        )
-        
         research_context = "\n".join([f"- {r.title}: {r.snippet[:300]} ({r.url})" for r in research])
         
-        analysis_program = LLMTextCompletionProgram.from_defaults(
-            output_cls=ResearchAnalysis,
-            prompt_template_str=analysis_prompt,
-            verbose=True
-        )
+        analysis_program = self._get_analysis_program()
         
+        repo_context = repo_context[:5000]
+
         print("Performing research analysis...")
-        analysis_output = analysis_program(repo_context=repo_context[:5000], research_context=research_context)
+        analysis_output = analysis_program(repo_context=repo_context, research_context=research_context)
         
         # STEP 2: ITERATIVE PROPOSAL SYNTHESIS
         ideas = []
-        idea_prompt = (
-            "You are a Lead Scientist. Based on the repo and research, generate a single formal engineering proposal.\n"
-            "This is proposal {index} of {total}.\n\n"
-            "REPO CONTEXT:\n{repo_context}\n\n"
-            "RESEARCH FINDINGS:\n{findings}\n\n"
-            "The proposal must be comprehensive (Rationale, Detailed Description, Implementation Plan, etc.) "
-            "and formal. Avoid repeating previous ideas: {previous_titles}"
-        )
-        
-        idea_program = LLMTextCompletionProgram.from_defaults(
-            output_cls=SingleIdea,
-            prompt_template_str=idea_prompt,
-            verbose=True
-        )
+        idea_program = self._get_idea_program()
         
         findings_str = "\n".join([f"- {f.paper_title}: {f.key_idea}" for f in analysis_output.research_findings])
         
+        titles = []
         for i in range(num):
             print(f"Generating formal proposal {i+1}/{num}...")
-            previous_titles = ", ".join([id.title for id in ideas])
             res = idea_program(
                 index=i+1, 
                 total=num, 
-                repo_context=repo_context[:5000], 
+                repo_context=repo_context, 
                 findings=findings_str,
-                previous_titles=previous_titles
+                previous_titles=", ".join(titles)
             )
             ideas.append(res.idea)
+            titles.append(res.idea.title)
             
         return {"ideas": ideas, "research_findings": analysis_output.research_findings}
 
     def _mock_generate_report(self, repo_context: str, research: List[ResearchResult], num: int) -> Dict[str, Any]:
         import random
-        from .models import ResearchFinding
         
         # Generate mock research findings
         findings = [
@@ -1,7 +1,12 @@
-import os
-import faiss
+import logging
+import multiprocessing
+import shutil
+import sqlite3
+import sys
+from functools import lru_cache
+import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from llama_index.core import (
     VectorStoreIndex, 
     StorageContext, 
@@ -9,33 +14,181 @@ from llama_index.core import (
     load_index_from_storage,
     Settings
 )
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core.retrievers import BaseRetriever, VectorIndexRetriever
-from llama_index.core.schema import NodeWithScore, QueryBundle
-from llama_index.core.node_parser import TokenTextSplitter
-from multiprocessing import cpu_count
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from .models import Manifest
+from .scanner import UNREADABLE_HASH, available_cpus
+
+# faiss, its vector store and bm25s are imported where they're used, so that
+# importing this module (pulled in by the CLI and thinker) stays cheap
+if TYPE_CHECKING:
+    from llama_index.core.node_parser import TokenTextSplitter
+    from llama_index.retrievers.bm25 import BM25Retriever
+    from llama_index.vector_stores.faiss import FaissMapVectorStore
+
+EMBED_DIM = 1536  # Default dimension for OpenAI embeddings
+VECTOR_STORE_FILE = "default__vector_store.json"  # Name FaissVectorStore persists under
+ID_MAP_FILE = "id_map.json"  # node id <-> faiss id maps, written next to it by FaissMapVectorStore
+BM25_DIR = "bm25"  # Precomputed bm25s index, rebuilt only when the docstore changes
+HASH_DB_FILE = "hashes.db"  # path -> content hash of every indexed file
+
+# Small corpora stay on an exhaustive index, stored as fp16 (half the memory
+# and bandwidth of fp32 flat L2 at negligible recall cost). Past this many vectors the index is
+# rebuilt as IVF-PQ: searches probe IVF_NPROBE of IVF_NLIST cells and each vector
+# is stored as PQ_M bytes instead of EMBED_DIM floats. The threshold also gives
+# the quantizers enough samples to train on.
+IVF_MIN_VECTORS = 10_000
+IVF_NLIST = 256
+PQ_M = 48
+IVF_NPROBE = 8
+
+# Local (in-process) embedders are CPU-bound under the GIL, so large batches are
+# sharded across forked workers instead
+LOCAL_EMBED_MIN_TEXTS = 256
+
+# Files past this size are left out of the index, as are files whose first
+# BINARY_SNIFF_BYTES contain a NUL byte
+MAX_INDEX_FILE_BYTES = 512_000
+BINARY_SNIFF_BYTES = 8192
+_fork_embed_model = None  # Inherited by forked workers, so weights are not reloaded
+
+@lru_cache(maxsize=None)
+def _faiss():
+    # By first use the CLI has configured logging, and faiss's loader reports each
+    # SIMD build it probes at INFO; keep that out of the output
+    logging.getLogger("faiss.loader").setLevel(logging.WARNING)
+    import faiss
+    return faiss
+
+@lru_cache(maxsize=None)
+def _id_map_store_cls():
+    from llama_index.vector_stores.faiss import FaissMapVectorStore, FaissVectorStore
+
+    class IdMapVectorStore(FaissMapVectorStore):
+        """FaissMapVectorStore that never reuses a faiss id and also accepts IVF indices.
+
+        Upstream numbers new vectors by ntotal, which after a deletion collides with
+        ids still in use. IVF indices store their own ids (and an IndexIDMap2 around
+        one mislabels vectors after remove_ids), so they are used unwrapped.
+        """
+
+        def __init__(self, faiss_index: Any) -> None:
+            faiss = _faiss()
+            if faiss.try_extract_index_ivf(faiss_index) is None and not isinstance(faiss_index, faiss.IndexIDMap2):
+                raise ValueError("IdMapVectorStore requires a faiss.IndexIDMap2 or IVF index")
+            FaissVectorStore.__init__(self, faiss_index=faiss_index)
+            self._node_id_to_faiss_id_map = {}
+            self._faiss_id_to_node_id_map = {}
+
+        def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+            if not nodes:
+                return []
+            start = max(self._faiss_id_to_node_id_map, default=-1) + 1
+            faiss_ids = np.arange(start, start + len(nodes), dtype=np.int64)
+            vectors = np.array([node.get_embedding() for node in nodes], dtype=np.float32)
+            self._faiss_index.add_with_ids(vectors, faiss_ids)
+            for node, faiss_id in zip(nodes, faiss_ids.tolist()):
+                self._node_id_to_faiss_id_map[node.node_id] = faiss_id
+                self._faiss_id_to_node_id_map[faiss_id] = node.node_id
+            return [node.node_id for node in nodes]
+
+    return IdMapVectorStore
+
+@lru_cache(maxsize=None)
+def _get_parser() -> "TokenTextSplitter":
+    from llama_index.core.node_parser import TokenTextSplitter
+    # Building the splitter loads its tiktoken vocabulary; do that once per process
+    return TokenTextSplitter(chunk_size=1024, chunk_overlap=20)
+
+def _is_local_cpu_embedder(embed_model) -> bool:
+    # Only look the class up if the optional package is already in use
+    hf = sys.modules.get("llama_index.embeddings.huggingface")
+    if hf is None or not isinstance(embed_model, hf.HuggingFaceEmbedding):
+        return False
+    # CUDA contexts don't survive a fork, and a GPU doesn't need the help
+    return str(getattr(embed_model, "_device", "cpu")) == "cpu"
+
+def _embed_shard(texts: List[str]) -> List[List[float]]:
+    import torch
+    # One intra-op thread per worker; the pool already occupies every core
+    torch.set_num_threads(1)
+    return _fork_embed_model.get_text_embedding_batch(texts)
+
+def _embed_texts(embed_model, texts: List[str]) -> List[List[float]]:
+    workers = min(available_cpus(), len(texts))
+    if (
+        workers < 2
+        or len(texts) < LOCAL_EMBED_MIN_TEXTS
+        or not _is_local_cpu_embedder(embed_model)
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return embed_model.get_text_embedding_batch(texts)
+
+    global _fork_embed_model
+    _fork_embed_model = embed_model
+    try:
+        # Interleaved shards keep every worker's share of long and short texts even
+        shards = [texts[w::workers] for w in range(workers)]
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            results = pool.map(_embed_shard, shards)
+    finally:
+        _fork_embed_model = None
+
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    for w, shard_embeddings in enumerate(results):
+        embeddings[w::workers] = shard_embeddings
+    return embeddings
 
 class HybridRetriever(BaseRetriever):
-    def __init__(self, vector_retriever: VectorIndexRetriever, bm25_retriever: BM25Retriever):
+    """Fuses dense and BM25 hits with Reciprocal Rank Fusion.
+
+    Cosine distances and BM25 scores are on unrelated scales, so only ranks are
+    combined: each list contributes 1 / (rrf_k + rank) per node.
+    """
+
+    def __init__(
+        self,
+        vector_retriever: VectorIndexRetriever,
+        bm25_retriever: "BM25Retriever",
+        similarity_top_k: Optional[int] = None,
+        rrf_k: int = 60,
+    ):
         self._vector_retriever = vector_retriever
         self._bm25_retriever = bm25_retriever
+        self._similarity_top_k = similarity_top_k
+        self._rrf_k = rrf_k
         super().__init__()
 
     def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
         vector_nodes = self._vector_retriever.retrieve(query_bundle)
         bm25_nodes = self._bm25_retriever.retrieve(query_bundle)
 
-        # Simple ensemble: combine and deduplicate
-        all_nodes = {node.node.node_id: node for node in vector_nodes}
-        for node in bm25_nodes:
-            if node.node.node_id not in all_nodes:
-                all_nodes[node.node.node_id] = node
-            else:
-                # Average the scores (naive)
-                all_nodes[node.node.node_id].score = (all_nodes[node.node.node_id].score + node.score) / 2
-        
-        return sorted(all_nodes.values(), key=lambda x: x.score, reverse=True)
+        hits = vector_nodes + bm25_nodes
+        if not hits:
+            return []
+
+        # Slot per distinct node over the candidate union; only these can receive a score
+        id_to_idx: Dict[str, int] = {}
+        idx = np.fromiter(
+            (id_to_idx.setdefault(hit.node.node_id, len(id_to_idx)) for hit in hits),
+            dtype=np.intp,
+            count=len(hits),
+        )
+        # Ranks are 1-based within each list
+        ranks = np.concatenate((np.arange(1, len(vector_nodes) + 1), np.arange(1, len(bm25_nodes) + 1)))
+        # One weighted bincount sums both lists' contributions per slot (unbuffered, unlike np.add.at)
+        scores = np.bincount(idx, weights=np.reciprocal(self._rrf_k + ranks, dtype=np.float64), minlength=len(id_to_idx))
+        # Slots are numbered by first appearance, so first_pos[j] is node j's first hit
+        _, first_pos = np.unique(idx, return_index=True)
+        candidates = [hits[i] for i in first_pos]
+
+        top_k = self._similarity_top_k
+        if top_k is not None and top_k < len(candidates):
+            top = np.argpartition(-scores, top_k)[:top_k]
+            order = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            order = np.argsort(-scores, kind="stable")
+        return [NodeWithScore(node=candidates[j].node, score=float(scores[j])) for j in order]
 
 class RepoIndexer:
     def __init__(self, storage_dir: Optional[str] = None):
@@ -45,52 +198,217 @@ class RepoIndexer:
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         self.index: Optional[VectorStoreIndex] = None
-        self.vector_store: Optional[FaissVectorStore] = None
+        self.vector_store: Optional["FaissMapVectorStore"] = None
+        self._bm25: Optional["BM25Retriever"] = None
+        self._hash_db: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def _new_exact_index(d: int = EMBED_DIM):
+        faiss = _faiss()
+        return faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
 
     def _initialize_empty_index(self):
-        d = 1536  # Default dimension for OpenAI embeddings
-        faiss_index = faiss.IndexFlatL2(d)
-        self.vector_store = FaissVectorStore(faiss_index=faiss_index)
+        faiss = _faiss()
+        faiss_index = faiss.IndexIDMap2(self._new_exact_index())
+        self.vector_store = _id_map_store_cls()(faiss_index=faiss_index)
         storage_context = StorageContext.from_defaults(vector_store=self.vector_store)
         self.index = VectorStoreIndex.from_documents([], storage_context=storage_context)
         self.index.storage_context.persist(persist_dir=str(self.storage_dir))
+        # A BM25 index left over from a previous store would point at dropped nodes
+        self._bm25 = None
+        shutil.rmtree(self.storage_dir / BM25_DIR, ignore_errors=True)
+        with self._get_hash_db() as db:
+            db.execute("DELETE FROM hashes")
 
     def load_or_create(self):
-        if (self.storage_dir / "vector_store.json").exists():
-            vector_store = FaissVectorStore.from_persist_dir(str(self.storage_dir))
+        if (self.storage_dir / VECTOR_STORE_FILE).exists():
+            faiss = _faiss()
+            positional_index = None
+            if (self.storage_dir / ID_MAP_FILE).exists():
+                vector_store = _id_map_store_cls().from_persist_dir(str(self.storage_dir))
+            else:
+                # Stores from before deletions were supported: FaissVectorStore, whose
+                # vector ids are positions. Load the nodes against an empty id-mapped
+                # store and move the vectors over below
+                from llama_index.vector_stores.faiss import FaissVectorStore
+                positional_index = FaissVectorStore.from_persist_dir(str(self.storage_dir)).client
+                empty_index = faiss.IndexIDMap2(self._new_exact_index(positional_index.d))
+                vector_store = _id_map_store_cls()(faiss_index=empty_index)
             storage_context = StorageContext.from_defaults(
                 vector_store=vector_store, persist_dir=str(self.storage_dir)
             )
-            self.index = load_index_from_storage(storage_context)
+            try:
+                self.index = load_index_from_storage(storage_context)
+            except ValueError as e:
+                # Older runs registered one index struct per update; start over
+                print(f"Rebuilding index, could not load existing one: {e}")
+                self._initialize_empty_index()
+                return
             self.vector_store = vector_store
+            if positional_index is not None:
+                print("Migrating vector index to id-mapped storage...")
+                self._migrate_positional_index(positional_index)
+                self.index.storage_context.persist(persist_dir=str(self.storage_dir))
+            ivf_index = faiss.try_extract_index_ivf(self.vector_store.client)
+            if ivf_index is not None:
+                ivf_index.nprobe = IVF_NPROBE
         else:
             self._initialize_empty_index()
 
+    def _migrate_positional_index(self, positional_index):
+        """Give a positional store's vectors ids of their own, keeping every node."""
+        faiss = _faiss()
+        if faiss.try_extract_index_ivf(positional_index) is not None:
+            # Keep the trained quantizers; only the stored vectors move
+            new_index = faiss.clone_index(positional_index)
+            new_index.reset()
+        else:
+            # Flat fp32 and fp16 stores alike end up on fp16
+            new_index = self._new_exact_index(positional_index.d)
+        self._rebuild_faiss_index(new_index, source=positional_index)
+        # The index struct mapped each position to its node; key it by node id, as
+        # the id-mapped store reports, and map the positions (now ids) to nodes
+        index_struct = self.index.index_struct
+        node_to_faiss = {node_id: int(vector_id) for vector_id, node_id in index_struct.nodes_dict.items()}
+        self.vector_store._node_id_to_faiss_id_map = node_to_faiss
+        self.vector_store._faiss_id_to_node_id_map = {faiss_id: node_id for node_id, faiss_id in node_to_faiss.items()}
+        index_struct.nodes_dict = {node_id: node_id for node_id in node_to_faiss}
+        self.index.storage_context.index_store.add_index_struct(index_struct)
+
+    def _rebuild_faiss_index(self, new_index, source=None):
+        """Move every stored vector into new_index (training it first) and swap it in.
+
+        Each vector keeps its faiss id. source defaults to the store's own index; a
+        positional index, where ids are positions, is accepted for migrations.
+        """
+        faiss = _faiss()
+        if source is None:
+            source = self.vector_store.client
+        if isinstance(source, faiss.IndexIDMap2):
+            ids = faiss.vector_to_array(source.id_map)
+            source = faiss.downcast_index(source.index)
+        else:
+            ids = np.arange(source.ntotal, dtype=np.int64)
+        source_ivf = faiss.try_extract_index_ivf(source)
+        if source_ivf is not None:
+            source_ivf.make_direct_map()  # IVF lists can only be read back by position through one
+        vectors = source.reconstruct_n(0, source.ntotal)
+        if not new_index.is_trained:
+            new_index.train(vectors)
+        if faiss.try_extract_index_ivf(new_index) is None:
+            new_index = faiss.IndexIDMap2(new_index)
+        new_index.add_with_ids(vectors, ids)
+        self.vector_store._faiss_index = new_index
+
+    def _maybe_compress_index(self) -> bool:
+        """Swap a large exhaustive index for a trained IVF-PQ one; returns True if swapped."""
+        faiss = _faiss()
+        faiss_index = self.vector_store.client
+        if faiss.try_extract_index_ivf(faiss_index) is not None or faiss_index.ntotal < IVF_MIN_VECTORS:
+            return False
+
+        print(f"Compressing vector index ({faiss_index.ntotal} vectors) to IVF-PQ...")
+        ivf_index = faiss.index_factory(faiss_index.d, f"IVF{IVF_NLIST},PQ{PQ_M}x8")
+        ivf_index.nprobe = IVF_NPROBE
+        self._rebuild_faiss_index(ivf_index)
+        return True
+
+    def _remove_indexed_files(self, paths: List[str]):
+        """Drop every node (and vector) of the given files from the index."""
+        docstore = self.index.docstore
+        node_ids = []
+        for path in paths:
+            # Documents are keyed by path; files that produced no nodes have no entry
+            ref_doc_info = docstore.get_ref_doc_info(path)
+            if ref_doc_info is not None:
+                node_ids.extend(ref_doc_info.node_ids)
+        # One remove_ids pass over the faiss index; delete_ref_doc can't find
+        # vectors by document, so it only drops the nodes themselves
+        self.vector_store.delete_nodes(node_ids)
+        for path in paths:
+            self.index.delete_ref_doc(path, delete_from_docstore=True)
+
+    def _get_hash_db(self) -> sqlite3.Connection:
+        if self._hash_db is None:
+            self._hash_db = sqlite3.connect(self.storage_dir / HASH_DB_FILE)
+            self._hash_db.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, hash TEXT)")
+        return self._hash_db
+
+    def _load_indexed_hashes(self) -> Dict[str, str]:
+        """Map of indexed path -> hash, without enumerating the docstore."""
+        db = self._get_hash_db()
+        indexed_hashes = dict(db.execute("SELECT path, hash FROM hashes"))
+        if not indexed_hashes and self.index.docstore.docs:
+            # Stores indexed before the sidecar existed: seed it from node metadata once
+            existing_docs = self.index.docstore.docs
+            for doc in existing_docs.values():
+                path = doc.metadata.get("path")
+                if not path:
+                    continue
+                if indexed_hashes.setdefault(path, doc.metadata.get("hash")) != doc.metadata.get("hash"):
+                    # Chunks from more than one version of the file: mark stale so it's rebuilt
+                    indexed_hashes[path] = ""
+            self._store_indexed_hashes(indexed_hashes.items())
+        return indexed_hashes
+
+    def _store_indexed_hashes(self, rows):
+        with self._get_hash_db() as db:
+            db.executemany("INSERT OR REPLACE INTO hashes (path, hash) VALUES (?, ?)", rows)
+
+    def _delete_indexed_hashes(self, paths):
+        with self._get_hash_db() as db:
+            db.executemany("DELETE FROM hashes WHERE path = ?", ((path,) for path in paths))
+
+    @staticmethod
+    def _embed_nodes(nodes: List[BaseNode]):
+        """Embed nodes in batches of similar length; insert_nodes then reuses node.embedding."""
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        # Length-sorted batches pad less; nodes themselves keep their original order
+        order = sorted(range(len(nodes)), key=lambda i: len(texts[i]))
+        embeddings = _embed_texts(Settings.embed_model, [texts[i] for i in order])
+        for i, embedding in zip(order, embeddings):
+            nodes[i].embedding = embedding
+
     def update_index(self, manifest: Manifest, repo_path: Path):
         self.load_or_create()
         
-        # Further Optimize: Use SentenceSplitter but disable slow features, 
-        # or stick to a fast tokenizer-based approach.
-        # Actually, let's use a very basic character-based splitter if token-based is still slow.
-        # But TokenTextSplitter should be fast. Let's ensure it's used correctly.
-        from llama_index.core.node_parser import TokenTextSplitter
-        parser = TokenTextSplitter(chunk_size=1024, chunk_overlap=20)
+        parser = _get_parser()
+        
+        # Track indexed documents via their content hashes
+        indexed_hashes = self._load_indexed_hashes()
         
-        # Track indexed documents via metadata hashes
-        existing_docs = self.index.docstore.docs
-        indexed_hashes = {doc.metadata.get("path"): doc.metadata.get("hash") 
-                         for doc in existing_docs.values() if doc.metadata.get("path")}
+        # Chunks of indexed files that changed or went away are dropped first; the
+        # changed ones are re-read below
+        files = manifest.files
+        stale = [path for path, file_hash in indexed_hashes.items()
+                 if path not in files or files[path].hash != file_hash]
+        if stale:
+            print(f"Removing {len(stale)} modified or deleted files from the index...")
+            try:
+                self._remove_indexed_files(stale)
+                for path in stale:
+                    del indexed_hashes[path]
+            except Exception as e:
+                print(f"Rebuilding index, could not remove them: {e}")
+                self._initialize_empty_index()  # Also clears the hash sidecar and BM25 index
+                indexed_hashes = {}
         
         documents = []
         new_or_modified = 0
         
         for rel_path, entry in manifest.files.items():
             # Check if file has changed
+            if entry.hash.startswith(UNREADABLE_HASH):
+                continue  # Nothing we could embed
             if entry.language and indexed_hashes.get(rel_path) != entry.hash:
+                if entry.size > MAX_INDEX_FILE_BYTES:
+                    continue  # lockfiles, generated code, data dumps
                 abs_path = repo_path / rel_path
                 try:
-                    with open(abs_path, "r", errors="ignore") as f:
-                        text = f.read()
+                    raw = abs_path.read_bytes()
+                    if b"\0" in raw[:BINARY_SNIFF_BYTES]:
+                        continue
+                    text = raw.decode("utf-8", "ignore")
                     doc = Document(
                         text=text,
                         metadata={
@@ -107,34 +425,64 @@ class RepoIndexer:
 
         if documents:
             print(f"Updating index with {new_or_modified} new/modified documents...")
-            # Disable progress bar and overhead during bulk transformation
-            # Setting globally might be more reliable
-            Settings.node_parser = parser
-            
-            self.index = VectorStoreIndex.from_documents(
-                documents, 
-                storage_context=self.index.storage_context,
-                show_progress=False, # Disable for speed
-                num_workers=cpu_count()
-            )
+            # Parse once and add to the loaded index, so every run extends the same
+            # index struct (from_documents would register a new one each time)
+            nodes = parser.get_nodes_from_documents(documents, show_progress=False)
+            self._embed_nodes(nodes)
+            self.index.insert_nodes(nodes)
+            self._maybe_compress_index()
+            self.index.storage_context.persist(persist_dir=str(self.storage_dir))
+            # Only record files once their nodes are persisted
+            self._delete_indexed_hashes(stale)
+            self._store_indexed_hashes((doc.metadata["path"], doc.metadata["hash"]) for doc in documents)
+            self._build_bm25()
+        elif stale:
             self.index.storage_context.persist(persist_dir=str(self.storage_dir))
+            self._delete_indexed_hashes(stale)
+            self._build_bm25()
+            print("Index updated; no new or modified files to add.")
         else:
             print("No changes detected. Index is up to date.")
+            # Indices built before IVF-PQ support may already be past the threshold
+            if self._maybe_compress_index():
+                self.index.storage_context.persist(persist_dir=str(self.storage_dir))
+
+    def _build_bm25(self) -> Optional["BM25Retriever"]:
+        """Score the whole docstore with bm25s once and persist the sparse index."""
+        from llama_index.retrievers.bm25 import BM25Retriever
+        nodes = list(self.index.docstore.docs.values())
+        self._bm25 = None
+        if not nodes:
+            return None
+        self._bm25 = BM25Retriever.from_defaults(nodes=nodes)
+        self._bm25.persist(str(self.storage_dir / BM25_DIR), show_progress=False)
+        return self._bm25
+
+    def _load_bm25(self) -> Optional["BM25Retriever"]:
+        if self._bm25 is not None:
+            return self._bm25
+        from llama_index.retrievers.bm25 import BM25Retriever
+        bm25_dir = self.storage_dir / BM25_DIR
+        if bm25_dir.exists():
+            try:
+                self._bm25 = BM25Retriever.from_persist_dir(str(bm25_dir), show_progress=False)
+                return self._bm25
+            except Exception as e:
+                print(f"Rebuilding BM25 index, could not load existing one: {e}")
+        # Stores indexed before BM25 was persisted
+        return self._build_bm25()
 
     def get_retriever(self, similarity_top_k: int = 5) -> HybridRetriever:
         if not self.index:
             raise ValueError("Index not loaded")
         
-        nodes = list(self.index.docstore.docs.values())
         vector_retriever = self.index.as_retriever(similarity_top_k=similarity_top_k)
+        bm25_retriever = self._load_bm25()
         
-        if not nodes:
+        if bm25_retriever is None:
             # Fallback for empty index
-            return HybridRetriever(vector_retriever, vector_retriever) # Simple fallback
-            
-        bm25_retriever = BM25Retriever.from_defaults(
-            nodes=nodes, 
-            similarity_top_k=similarity_top_k
-        )
+            return HybridRetriever(vector_retriever, vector_retriever, similarity_top_k) # Simple fallback
         
-        return HybridRetriever(vector_retriever, bm25_retriever)
+        # bm25s can't return more hits than it has documents
+        bm25_retriever.similarity_top_k = min(similarity_top_k, len(bm25_retriever.corpus))
+        return HybridRetriever(vector_retriever, bm25_retriever, similarity_top_k)
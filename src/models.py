@@ -1,5 +1,7 @@
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from functools import cached_property
+from typing import Dict, List, Optional, Any, Tuple
+import xxhash
 from pydantic import BaseModel, Field
 
 class FileEntry(BaseModel):
@@ -33,12 +35,27 @@ class Manifest(BaseModel):
     scanned_at: datetime = Field(default_factory=datetime.now)
     files: Dict[str, FileEntry]  # path -> FileEntry
 
+    @cached_property
+    def python_files(self) -> Tuple[Tuple[str, FileEntry], ...]:
+        # Filtered once and shared by every consumer that only wants Python sources
+        return tuple((rel_path, entry) for rel_path, entry in self.files.items() if entry.language == "python")
+
+    @cached_property
+    def _content_hash(self) -> str:
+        # Use only path and hash for strictly stable caching. Manifests aren't
+        # mutated after a scan, so computed once per instance
+        h = xxhash.xxh3_64()
+        files = self.files
+        for path in sorted(files):
+            # Separators keep ("ab", "c") and ("a", "bc") from colliding
+            h.update(path.encode())
+            h.update(b"\x00")
+            h.update(files[path].hash.encode())
+            h.update(b"\x01")
+        return h.hexdigest()
+
     def calculate_hash(self) -> str:
-        import hashlib
-        import json
-        # Use only path and hash for strictly stable caching
-        data = {k: v.hash for k, v in self.files.items()}
-        return hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        return self._content_hash
 
 class Citation(BaseModel):
     title: str
@@ -2,8 +2,18 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, Any, Optional
 
+# Modernized pricing per token (roughly OpenAI/Anthropic averages)
+_PRICES = MappingProxyType({
+    "gpt-4-turbo": {"input": 0.01 / 1000, "output": 0.03 / 1000},
+    "claude-3-opus": {"input": 0.015 / 1000, "output": 0.075 / 1000},
+    "gemini-1.5-pro": {"input": 0.0035 / 1000, "output": 0.0105 / 1000},
+    "mock": {"input": 0.0, "output": 0.0}
+})
+_DEFAULT_PRICE = _PRICES["gpt-4-turbo"]
+
 class CostTracker:
     def __init__(self, budget_usd: float = 5.0):
         self.total_cost = 0.0
@@ -11,28 +21,24 @@ class CostTracker:
         self.token_usage = {"input": 0, "output": 0}
 
     def add_usage(self, input_tokens: int, output_tokens: int, model: str = "gpt-4-turbo"):
-        # Modernized pricing (roughly OpenAI/Anthropic averages)
-        prices = {
-            "gpt-4-turbo": {"input": 0.01 / 1000, "output": 0.03 / 1000},
-            "claude-3-opus": {"input": 0.015 / 1000, "output": 0.075 / 1000},
-            "gemini-1.5-pro": {"input": 0.0035 / 1000, "output": 0.0105 / 1000},
-            "mock": {"input": 0.0, "output": 0.0}
-        }
-        
-        p = prices.get(model, prices["gpt-4-turbo"])
-        cost = (input_tokens * p["input"]) + (output_tokens * p["output"])
-        
-        self.total_cost += cost
         self.token_usage["input"] += input_tokens
         self.token_usage["output"] += output_tokens
+        if model == "mock":
+            return  # Free, and can't push us over budget
+        
+        p = _PRICES.get(model, _DEFAULT_PRICE)
+        self.total_cost += (input_tokens * p["input"]) + (output_tokens * p["output"])
         
         if self.total_cost > self.budget:
             logging.warning(f"BUDGET EXCEEDED: {self.total_cost:.4f} > {self.budget}")
 
     def estimate_and_add(self, text_in: str, text_out: str, model: str = "gpt-4-turbo"):
+        self.estimate_from_length(len(text_in), len(text_out), model)
+
+    def estimate_from_length(self, input_chars: int, output_chars: int, model: str = "gpt-4-turbo"):
         # Standard heuristic: 1 token ~= 4 characters for English
-        input_tokens = len(text_in) // 4
-        output_tokens = len(text_out) // 4
+        input_tokens = input_chars // 4
+        output_tokens = output_chars // 4
         self.add_usage(input_tokens, output_tokens, model)
 
     def get_summary(self) -> Dict[str, Any]:
@@ -1,8 +1,14 @@
+import asyncio
+import importlib.util
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
 
+BRAVE_TIMEOUT = 30.0
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it httpx stays on HTTP/1.1 keep-alive
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
 class ResearchResult(BaseModel):
     title: str
     url: str
@@ -16,6 +22,25 @@ class SearchProvider(ABC):
     def search(self, query: str, limit: int = 5) -> List[ResearchResult]:
         pass
 
+    def search_checked(self, query: str, limit: int = 5) -> Tuple[List[ResearchResult], bool]:
+        """Like search, plus whether the results are stand-ins from a fallback rather than real hits."""
+        return self.search(query, limit), False
+
+    async def asearch(self, query: str, limit: int = 5) -> List[ResearchResult]:
+        # Providers without a native async path run the blocking search in a thread
+        return await asyncio.to_thread(self.search, query, limit)
+
+    async def asearch_batch(self, queries: List[str], limit: int = 5,
+                            max_concurrency: int = 8) -> List[List[ResearchResult]]:
+        # Results come back in query order
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(query: str) -> List[ResearchResult]:
+            async with semaphore:
+                return await self.asearch(query, limit)
+
+        return list(await asyncio.gather(*(bounded(q) for q in queries)))
+
 class MockSearchProvider(SearchProvider):
     def search(self, query: str, limit: int = 5) -> List[ResearchResult]:
         real_papers = [
@@ -66,18 +91,25 @@ class BraveSearchProvider(SearchProvider):
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
         self.base_url = "https://api.search.brave.com/res/v1/web/search"
+        self._client: Optional[httpx.Client] = None
 
-    def search(self, query: str, limit: int = 5) -> List[ResearchResult]:
+    def _client_kwargs(self) -> Dict[str, Any]:
         if not self.api_key:
             raise ValueError("Brave API Key is required")
-        
-        headers = {"Accept": "application/json", "X-Subscription-Token": self.api_key}
-        params = {"q": query, "count": limit}
-        
-        response = httpx.get(self.base_url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
+        return {
+            "http2": _HTTP2,
+            "timeout": BRAVE_TIMEOUT,
+            "headers": {"Accept": "application/json", "X-Subscription-Token": self.api_key},
+        }
+
+    def _get_client(self) -> httpx.Client:
+        # One keep-alive connection for every search instead of a TLS handshake per call
+        if self._client is None:
+            self._client = httpx.Client(**self._client_kwargs())
+        return self._client
+
+    @staticmethod
+    def _parse_results(data: Dict[str, Any]) -> List[ResearchResult]:
         results = []
         for item in data.get("web", {}).get("results", []):
             results.append(ResearchResult(
@@ -89,14 +121,44 @@ class BraveSearchProvider(SearchProvider):
             ))
         return results
 
-class LLMSearchProvider(SearchProvider):
     def search(self, query: str, limit: int = 5) -> List[ResearchResult]:
-        from llama_index.core.program import LLMTextCompletionProgram
-        from llama_index.core import Settings
-        from pydantic import BaseModel
+        response = self._get_client().get(self.base_url, params={"q": query, "count": limit})
+        response.raise_for_status()
+        return self._parse_results(response.json())
+
+    async def asearch_batch(self, queries: List[str], limit: int = 5,
+                            max_concurrency: int = 8) -> List[List[ResearchResult]]:
+        # Async clients are bound to their event loop, so each batch gets its own;
+        # with HTTP/2 the whole batch is multiplexed over one connection
+        semaphore = asyncio.Semaphore(max_concurrency)
 
-        class SearchResults(BaseModel):
-            results: List[ResearchResult]
+        async with httpx.AsyncClient(**self._client_kwargs()) as client:
+            async def fetch(query: str) -> List[ResearchResult]:
+                async with semaphore:
+                    response = await client.get(self.base_url, params={"q": query, "count": limit})
+                response.raise_for_status()
+                return self._parse_results(response.json())
+
+            return list(await asyncio.gather(*(fetch(q) for q in queries)))
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+class SearchResults(BaseModel):
+    results: List[ResearchResult]
+
+class LLMSearchProvider(SearchProvider):
+    def __init__(self):
+        self._program = None
+
+    def _build_program(self):
+        # Reused across searches; verification runs one search per idea
+        if self._program is not None:
+            return self._program
+
+        from llama_index.core.program import LLMTextCompletionProgram
 
         # Refined prompt to avoid "real-time" refusal
         prompt = (
@@ -109,21 +171,38 @@ class LLMSearchProvider(SearchProvider):
             "Output as valid JSON matching the SearchResults schema."
         )
 
+        self._program = LLMTextCompletionProgram.from_defaults(
+            output_cls=SearchResults,
+            prompt_template_str=prompt,
+            verbose=True
+        )
+        return self._program
+
+    def _fallback(self, query: str, limit: int, e: Exception) -> List[ResearchResult]:
+        print(f"Warning: Knowledge search failed ({e}). Falling back to baseline authoritative papers.")
+        # Fallback to the real papers defined in MockSearchProvider
+        return MockSearchProvider().search(query, limit)
+
+    def search(self, query: str, limit: int = 5) -> List[ResearchResult]:
+        return self.search_checked(query, limit)[0]
+
+    def search_checked(self, query: str, limit: int = 5) -> Tuple[List[ResearchResult], bool]:
         try:
-            program = LLMTextCompletionProgram.from_defaults(
-                output_cls=SearchResults,
-                prompt_template_str=prompt,
-                verbose=True
-            )
-            
+            program = self._build_program()
             print(f"Agent is analyzing internal research knowledge for: {query[:50]}...")
             output = program(query=query, limit=limit)
+            return output.results, False
+        except Exception as e:
+            return self._fallback(query, limit, e), True
+
+    async def asearch(self, query: str, limit: int = 5) -> List[ResearchResult]:
+        try:
+            program = self._build_program()
+            print(f"Agent is analyzing internal research knowledge for: {query[:50]}...")
+            output = await program.acall(query=query, limit=limit)
             return output.results
         except Exception as e:
-            print(f"Warning: Knowledge search failed ({e}). Falling back to baseline authoritative papers.")
-            # Fallback to the real papers defined in MockSearchProvider
-            fallback = MockSearchProvider().search(query, limit)
-            return fallback
+            return self._fallback(query, limit, e)
 
 class WebResearcher:
     def __init__(self, provider: SearchProvider):
@@ -134,3 +213,15 @@ class WebResearcher:
         # For now, we use the topic directly
         results = self.provider.search(topic, limit=5 * depth)
         return results
+
+    def perform_research_checked(self, topic: str, depth: int = 1) -> Tuple[List[ResearchResult], bool]:
+        # Same as perform_research, plus whether the provider fell back to stand-in results
+        return self.provider.search_checked(topic, limit=5 * depth)
+
+    async def aperform_research(self, topic: str, depth: int = 1) -> List[ResearchResult]:
+        return await self.provider.asearch(topic, limit=5 * depth)
+
+    async def aperform_research_batch(self, topics: List[str], depth: int = 1,
+                                      max_concurrency: int = 8) -> List[List[ResearchResult]]:
+        # One result list per topic, fetched concurrently instead of one round-trip at a time
+        return await self.provider.asearch_batch(topics, limit=5 * depth, max_concurrency=max_concurrency)
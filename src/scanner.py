@@ -1,16 +1,96 @@
+import mmap
 import os
+import re
 import xxhash
 import pathspec
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, List, Set, Optional
 from .models import FileEntry, Manifest
 
+# Files below this size are hashed in-process; shipping them to a worker costs
+# more than hashing them. Larger files only go to a pool once there is enough
+# data to pay for starting one.
+_INLINE_HASH_BYTES = 256 * 1024
+_MIN_PARALLEL_HASH_BYTES = 32 * 1024 * 1024
+_MMAP_MAX_BYTES = 64 * 1024 * 1024
+_EMPTY_HASH = xxhash.xxh64_hexdigest(b"")
+UNREADABLE_HASH = "UNREADABLE"  # Prefix of FileEntry.hash for files that couldn't be read
+_NAMED_GROUP = re.compile(r"\(\?P<[^>]+>")
+
+_EXT_MAP = MappingProxyType({
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript-react",
+    ".jsx": "javascript-react",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "java",
+    ".cpp": "cpp",
+    ".c": "c",
+    ".h": "cpp",
+    ".hpp": "cpp",
+    ".cs": "csharp",
+    ".rb": "ruby",
+    ".php": "php",
+    ".swift": "swift",
+    ".kt": "kotlin",
+    ".sh": "shell",
+    ".md": "markdown",
+    ".json": "json",
+    ".yml": "yaml",
+    ".yaml": "yaml",
+    ".xml": "xml",
+    ".html": "html",
+    ".css": "css",
+    ".sql": "sql",
+})
+
+
+def available_cpus() -> int:
+    """CPUs this process may actually run on (affinity/cgroup cpusets), for sizing worker pools."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def _hash_file(file_path) -> str:
+    # Module-level so it can be pickled into worker processes
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return _EMPTY_HASH
+            if size <= _MMAP_MAX_BYTES:
+                # Hash the mapped pages directly instead of copying them through read()
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return xxhash.xxh64(mm).hexdigest()
+            # Very large files: stream instead of mapping them whole
+            hasher = xxhash.xxh64()
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+            return hasher.hexdigest()
+    except (FileNotFoundError, OSError, PermissionError, ValueError) as e:
+        # Not a content hash: consumers skip these. The mtime keeps it stable
+        # across runs until the file is touched
+        print(f"Could not hash unreadable file {file_path}: {e}")
+        try:
+            return f"{UNREADABLE_HASH}:{int(os.stat(file_path).st_mtime)}"
+        except OSError:
+            return UNREADABLE_HASH
+
+
 class RepoScanner:
     def __init__(self, repo_path: str, ignore_file: str = ".idea-agent-ignore"):
         self.repo_path = Path(repo_path).resolve()
         self.ignore_file = ignore_file
         self.spec = self._load_ignore_spec()
+        self._ignore_re = self._compile_ignore_regex(self.spec)
 
     def _load_ignore_spec(self) -> pathspec.PathSpec:
         patterns = [".git/", ".idea/", "__pycache__/", "*.pyc", "node_modules/", ".idea-producer/"]
@@ -29,82 +109,115 @@ class RepoScanner:
         
         return pathspec.PathSpec.from_lines("gitignore", patterns)
 
+    @staticmethod
+    def _compile_ignore_regex(spec: pathspec.PathSpec) -> Optional[re.Pattern]:
+        """Fold the spec into one alternation so each path costs a single C-level match.
+
+        Returns None when a negated (!) pattern is present: there the last matching
+        pattern decides, which a plain union can't express.
+        """
+        regexes = []
+        for pattern in spec.patterns:
+            if pattern.include is None:
+                continue  # blank line or comment
+            if not pattern.include:
+                return None
+            # Group names may repeat across patterns, which re rejects in a union
+            regexes.append(_NAMED_GROUP.sub("(?:", pattern.regex.pattern))
+        if not regexes:
+            return None
+        return re.compile("|".join(f"(?:{r})" for r in regexes))
+
+    def _is_ignored(self, rel_path: str) -> bool:
+        if self._ignore_re is not None:
+            return self._ignore_re.match(rel_path) is not None
+        return self.spec.match_file(rel_path)
+
     def _get_file_hash(self, file_path: Path) -> str:
-        hasher = xxhash.xxh64()
-        try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(65536), b""):
-                    hasher.update(chunk)
-        except (FileNotFoundError, OSError, PermissionError) as e:
-            # Fallback to a hash of the path if file is unreadable but exists
-            return xxhash.xxh64(str(file_path)).hexdigest()
-        return hasher.hexdigest()
+        return _hash_file(file_path)
 
     def _guess_language(self, file_path: Path) -> Optional[str]:
-        extension_map = {
-            ".py": "python",
-            ".js": "javascript",
-            ".ts": "typescript",
-            ".tsx": "typescript-react",
-            ".jsx": "javascript-react",
-            ".go": "go",
-            ".rs": "rust",
-            ".java": "java",
-            ".cpp": "cpp",
-            ".c": "c",
-            ".h": "cpp",
-            ".hpp": "cpp",
-            ".cs": "csharp",
-            ".rb": "ruby",
-            ".php": "php",
-            ".swift": "swift",
-            ".kt": "kotlin",
-            ".sh": "shell",
-            ".md": "markdown",
-            ".json": "json",
-            ".yml": "yaml",
-            ".yaml": "yaml",
-            ".xml": "xml",
-            ".html": "html",
-            ".css": "css",
-            ".sql": "sql",
-        }
-        return extension_map.get(file_path.suffix.lower())
+        return _EXT_MAP.get(file_path.suffix.lower())
+
+    def _walk(self, dir_path: str, rel_root: str = ""):
+        """Yield (rel_path, DirEntry) for every non-ignored regular file under dir_path.
+
+        A directory's files come before its subdirectories' (same order as
+        os.walk). Symlinks are never followed.
+        """
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for de in it:
+                    # DirEntry answers these from d_type, without a stat per entry
+                    if de.is_symlink():
+                        continue
+                    rel_path = os.path.join(rel_root, de.name)
+                    if de.is_dir(follow_symlinks=False):
+                        if not self._is_ignored(rel_path + "/"):
+                            subdirs.append((de.path, rel_path))
+                    elif de.is_file(follow_symlinks=False):
+                        # Skips broken symlinks and special files
+                        files.append((rel_path, de))
+        except OSError:
+            # os.walk silently skipped unreadable directories too
+            return
+
+        for rel_path, de in [f for f in files if not self._is_ignored(f[0])]:
+            yield rel_path, de
+        for sub_path, sub_rel in subdirs:
+            yield from self._walk(sub_path, sub_rel)
 
     def scan(self) -> Manifest:
+        # Phase 1: walk and stat (cheap)
+        found = []
+        for rel_path, de in self._walk(str(self.repo_path)):
+            try:
+                found.append((rel_path, de.path, de.stat(follow_symlinks=False)))
+            except (FileNotFoundError, OSError, PermissionError) as e:
+                print(f"Skipping unreadable file {de.path}: {e}")
+
+        # Phase 2: hash, fanning large files out across processes
+        hashes = self._hash_files(found)
+
+        # Phase 3: assemble entries in walk order
         file_entries: Dict[str, FileEntry] = {}
-        
-        for root, dirs, files in os.walk(self.repo_path):
-            rel_root = os.path.relpath(root, self.repo_path)
-            if rel_root == ".":
-                rel_root = ""
-            
-            # Filter directories in-place for os.walk
-            dirs[:] = [d for d in dirs if not self.spec.match_file(os.path.join(rel_root, d) + "/")]
-            
-            for file in files:
-                rel_path = os.path.join(rel_root, file)
-                if not self.spec.match_file(rel_path):
-                    abs_path = self.repo_path / rel_path
-                    try:
-                        # Only process regular files, skip broken symlinks and special files
-                        if not abs_path.is_file() or abs_path.is_symlink():
-                            continue
-                            
-                        stats = abs_path.stat()
-                        
-                        file_entries[rel_path] = FileEntry(
-                            path=rel_path,
-                            size=stats.st_size,
-                            hash=self._get_file_hash(abs_path),
-                            last_modified=datetime.fromtimestamp(stats.st_mtime),
-                            language=self._guess_language(abs_path)
-                        )
-                    except (FileNotFoundError, OSError, PermissionError) as e:
-                        print(f"Skipping unreadable file {abs_path}: {e}")
+        for (rel_path, abs_path, stats), file_hash in zip(found, hashes):
+            file_entries[rel_path] = FileEntry(
+                path=rel_path,
+                size=stats.st_size,
+                hash=file_hash,
+                last_modified=datetime.fromtimestamp(stats.st_mtime),
+                language=_EXT_MAP.get(os.path.splitext(rel_path)[1].lower())
+            )
         
         return Manifest(repo_path=str(self.repo_path), files=file_entries)
 
+    def _hash_files(self, found) -> List[str]:
+        hashes: List[Optional[str]] = [None] * len(found)
+        large = []
+        for i, (_, abs_path, stats) in enumerate(found):
+            if stats.st_size < _INLINE_HASH_BYTES:
+                hashes[i] = _hash_file(abs_path)
+            else:
+                large.append(i)
+
+        workers = available_cpus()
+        large_bytes = sum(found[i][2].st_size for i in large)
+        if workers == 1 or len(large) < 2 or large_bytes < _MIN_PARALLEL_HASH_BYTES:
+            for i in large:
+                hashes[i] = _hash_file(found[i][1])
+            return hashes
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(large))) as ex:
+            paths = [found[i][1] for i in large]
+            # One file per task: each is >= _INLINE_HASH_BYTES, so IPC is noise, and
+            # batching a short list would hand it all to a single worker
+            for i, file_hash in zip(large, ex.map(_hash_file, paths)):
+                hashes[i] = file_hash
+        return hashes
+
     def get_diff(self, old_manifest: Manifest, new_manifest: Manifest) -> Dict[str, List[str]]:
         diff = {
             "added": [],
@@ -53,7 +53,7 @@ class RepoThinker:
         )
 
         # Truncate symbol inventory for prompt
-        symbol_sample = {k: v.model_dump() for k, v in list(raw_analysis.items())[:15]}
+        symbol_sample = {k: v.to_dict() for k, v in list(raw_analysis.items())[:15]}
         
         program = LLMTextCompletionProgram.from_defaults(
             output_cls=ProjectKnowledge,
@@ -105,35 +105,31 @@ class RepoThinker:
     @staticmethod
     def to_markdown(knowledge: ProjectKnowledge) -> str:
         nl = "\n"
-        md = f"# Project Knowledge Base: {knowledge.repo_name}{nl}{nl}"
-        md += f"**Analyzed at**: {knowledge.analyzed_at}{nl}{nl}"
-        
-        md += f"## Executive Summary{nl}{knowledge.executive_summary}{nl}{nl}"
-        
-        md += f"## Tech Stack{nl}"
-        for tech in knowledge.tech_stack:
-            md += f"- {tech}{nl}"
-        md += nl
-        
-        md += f"## Architecture Description{nl}{knowledge.architecture_description}{nl}{nl}"
-        
-        md += f"## Component Map{nl}"
-        for name, resp in knowledge.component_map.items():
-            md += f"- **{name}**: {resp}{nl}"
-        md += nl
-        
-        md += f"## Key Findings{nl}{nl}"
+        parts = [
+            f"# Project Knowledge Base: {knowledge.repo_name}{nl}{nl}",
+            f"**Analyzed at**: {knowledge.analyzed_at}{nl}{nl}",
+            f"## Executive Summary{nl}{knowledge.executive_summary}{nl}{nl}",
+            f"## Tech Stack{nl}",
+        ]
+        parts.extend(f"- {tech}{nl}" for tech in knowledge.tech_stack)
+        parts.append(nl)
+        
+        parts.append(f"## Architecture Description{nl}{knowledge.architecture_description}{nl}{nl}")
+        
+        parts.append(f"## Component Map{nl}")
+        parts.extend(f"- **{name}**: {resp}{nl}" for name, resp in knowledge.component_map.items())
+        parts.append(nl)
+        
+        parts.append(f"## Key Findings{nl}{nl}")
         for finding in knowledge.key_findings:
-            md += f"### [{finding.category}] {finding.summary}{nl}"
-            md += f"{finding.detailed_insight}{nl}{nl}"
+            parts.append(f"### [{finding.category}] {finding.summary}{nl}")
+            parts.append(f"{finding.detailed_insight}{nl}{nl}")
             if finding.evidence:
-                md += f"**Evidence**:{nl}"
-                for e in finding.evidence:
-                    md += f"- `{e}`{nl}"
-                md += nl
+                parts.append(f"**Evidence**:{nl}")
+                parts.extend(f"- `{e}`{nl}" for e in finding.evidence)
+                parts.append(nl)
         
-        md += f"## Global Research Context{nl}"
-        for ctx in knowledge.research_context:
-            md += f"- {ctx}{nl}"
+        parts.append(f"## Global Research Context{nl}")
+        parts.extend(f"- {ctx}{nl}" for ctx in knowledge.research_context)
         
-        return md
\ No newline at end of file
+        return "".join(parts)
\ No newline at end of file